@@ -5,27 +5,59 @@ Output the parameters that makemodel supports with their ranges
 '''
 
 import makemodel
-import json, sys
-from collections import OrderedDict
+import json, sys, os, inspect, hashlib, tempfile
+
+#the output only changes when makemodel or this script does, so cache it
+#keyed on a hash of both sources
+srcfile = inspect.getsourcefile(makemodel)
+cachefile = os.path.join(os.path.dirname(os.path.abspath(srcfile)), '.outputjson.cache')
+sha = hashlib.sha1()
+for fname in (srcfile, __file__):
+	with open(fname, 'rb') as f:
+		sha.update(f.read())
+srchash = sha.hexdigest()
+
+if os.path.isfile(cachefile):
+	with open(cachefile) as f:
+		if f.readline().strip() == srchash:
+			sys.stdout.write(f.read())
+			sys.exit(0)
 
 #extract from arguments to makemodel
 opts = makemodel.getoptions()
 
-d=OrderedDict()
+d={}
 for (name,vals) in sorted(opts.items()):
 	paramsize=1
 	if type(vals) == tuple:
-		options=map(str,vals)
+		options=[str(v) for v in vals]
 		paramtype="enum"
-		data=OrderedDict([("name",name), ("type", paramtype), ("size", paramsize),("options",options)])
+		data={"name":name, "type":paramtype, "size":paramsize, "options":options}
 	elif isinstance(vals, makemodel.Range):
 		parammin = vals.min
 		parammax = vals.max
 		paramtype="float"
-		data=OrderedDict([("name",name), ("type", paramtype), ("min", parammin), ("max", parammax), ("size", paramsize)])
+		data={"name":name, "type":paramtype, "min":parammin, "max":parammax, "size":paramsize}
 	else:
 		print "Unknown type"
 		sys.exit(-1)
 	d[name]=data
-sys.stdout.write(json.dumps(d, indent=4)+'\n')
+out = json.dumps(d, indent=4, separators=(',', ': '), sort_keys=True)+'\n'
+sys.stdout.write(out)
 
+#write to a temporary file and rename it into place, so a concurrent
+#run never reads a partially written cache; caching is best effort
+tmpfile = None
+try:
+	fd, tmpfile = tempfile.mkstemp(prefix='.outputjson.cache.', dir=os.path.dirname(cachefile))
+	with os.fdopen(fd, 'w') as f:
+		f.write(srchash+'\n'+out)
+	os.chmod(tmpfile, 0o644) #mkstemp creates it private
+	os.rename(tmpfile, cachefile)
+except (IOError, OSError):
+	#don't leave a stray temporary file behind
+	if tmpfile and os.path.exists(tmpfile):
+		try:
+			os.remove(tmpfile)
+		except OSError:
+			pass
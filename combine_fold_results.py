@@ -1,75 +1,108 @@
 #!/usr/bin/env python
 
+from __future__ import print_function
+
 import numpy as np
 import matplotlib
 matplotlib.use('Agg')
+#simplify long series when rendering, they are saved at display resolution anyway
+matplotlib.rcParams['path.simplify_threshold'] = 1.0
+matplotlib.rcParams['agg.path.chunksize'] = 10000
 import matplotlib.pyplot as plt
-import glob, re, argparse, sys, os
-import sklearn.metrics
+import re, argparse, sys, os, io
 
 
-def read_results_file(file):
+def read_results_file(file, dtype=np.float64):
     '''Read columns of float data from a file, ignoring # comments'''
-    rows = []
-    with open(file, 'r') as f:
-        for line in f:
-            line = line.split('#', 1)[0].strip()
-            if line:
-                rows.append(map(float, line.split(' ')))
-    return zip(*rows)
+    data = np.loadtxt(file, comments='#', dtype=dtype, ndmin=2)
+    return tuple(data.T)
 
 
 def write_results_file(file, *columns, **kwargs):
     '''Write columns of data to a file, with optional footer comment'''
     footer = kwargs.get('footer', '')
-    with open(file, 'w') as f:
-        for row in zip(*columns):
-            f.write(' '.join(map(str, row)) + '\n')
-        if footer:
-            f.write('# %s' % footer)
+    data = np.column_stack([np.asarray(c) for c in columns])
+    buf = io.BytesIO() #build the whole file in memory, then write it once
+    np.savetxt(buf, data, fmt='%s')
+    if footer:
+        buf.write(('# %s' % footer).encode())
+    with open(file, 'wb') as f:
+        f.write(buf.getvalue())
 
 
 def last_iters_statistics(test_aucs, test_interval, last_iters):
     n_last_tests = int(last_iters/test_interval)
-    last_test_aucs = [x[-n_last_tests:] for x in test_aucs]
-    return np.mean(last_test_aucs), np.max(last_test_aucs), np.min(last_test_aucs)
+    last_test_aucs = np.asarray(test_aucs, dtype=np.float32)[:, -n_last_tests:]
+    return last_test_aucs.mean(), last_test_aucs.max(), last_test_aucs.min()
+
+
+MAX_ROC_POINTS = 2000
 
 
-def training_plot(plot_file, train_series, test_series):
+def get_axes(ax=None, figsize=None):
+    '''Return ax reset for a new plot, or new axes if ax is None'''
+    if ax is None:
+        fig, ax = plt.subplots()
+    else:
+        #cla() keeps the aspect and tick label sizes of the previous plot
+        ax.cla()
+        ax.set_aspect('auto')
+        ax.tick_params(axis='x', which='major', labelsize=plt.rcParams['xtick.labelsize'])
+        ax.tick_params(axis='y', which='major', labelsize=plt.rcParams['ytick.labelsize'])
+    if figsize:
+        ax.figure.set_size_inches(figsize)
+    return ax
+
+
+def save_axes(plot_file, ax, close):
+    ax.figure.savefig(plot_file, dpi=100, bbox_inches='tight')
+    if close:
+        plt.close(ax.figure)
+
+
+def training_plot(plot_file, train_series, test_series, ax=None):
     assert len(train_series) == len(test_series)
-    fig = plt.figure()
-    plt.plot(train_series, label='Train')
-    plt.plot(test_series, label='Test')
-    plt.legend(loc='best')
-    plt.savefig(plot_file, bbox_inches='tight')
+    close = ax is None
+    ax = get_axes(ax, plt.rcParams['figure.figsize'])
+    ax.plot(train_series, label='Train')
+    ax.plot(test_series, label='Test')
+    ax.legend(loc='best')
+    save_axes(plot_file, ax, close)
 
 
-def plot_roc_curve(plot_file, fpr, tpr, auc, txt):
+def plot_roc_curve(plot_file, fpr, tpr, auc, txt, ax=None):
     assert len(fpr) == len(tpr)
-    fig = plt.figure(figsize=(8,8))
-    plt.plot(fpr, tpr, label='CNN (AUC=%.2f)' % auc, linewidth=4)
-    plt.legend(loc='lower right',fontsize=20)
-    plt.xlabel('False Positive Rate',fontsize=22)
-    plt.ylabel('True Positive Rate',fontsize=22)
-    plt.axes().set_aspect('equal')
-    plt.tick_params(axis='both', which='major', labelsize=16)
-    plt.text(.05, -.25, txt, fontsize=22)
-    plt.savefig(plot_file, bbox_inches='tight')
-
-
-def plot_correlation(plot_file, y_aff, y_predaff, rmsd, r2):
+    #downsample to at most MAX_ROC_POINTS, keeping the final point
+    step = max(1, -(-(len(fpr) - 1) // (MAX_ROC_POINTS - 1)))
+    if step > 1:
+        fpr = np.r_[fpr[:-1:step], fpr[-1]]
+        tpr = np.r_[tpr[:-1:step], tpr[-1]]
+    close = ax is None
+    ax = get_axes(ax, (8,8))
+    ax.plot(fpr, tpr, label='CNN (AUC=%.2f)' % auc, linewidth=4)
+    ax.legend(loc='lower right',fontsize=20)
+    ax.set_xlabel('False Positive Rate',fontsize=22)
+    ax.set_ylabel('True Positive Rate',fontsize=22)
+    ax.set_aspect('equal')
+    ax.tick_params(axis='both', which='major', labelsize=16)
+    ax.text(.05, -.25, txt, fontsize=22)
+    save_axes(plot_file, ax, close)
+
+
+def plot_correlation(plot_file, y_aff, y_predaff, rmsd, r2, ax=None):
     assert len(y_aff) == len(y_predaff)
-    fig = plt.figure(figsize=(8,8))
-    plt.plot(y_aff, y_predaff, 'o', label='RMSD=%.2f, R^2=%.3f (Pos)' % (rmsd, r2))
-    plt.legend(loc='best', fontsize=20, numpoints=1)
+    close = ax is None
+    ax = get_axes(ax, (8,8))
+    ax.plot(y_aff, y_predaff, 'o', label='RMSD=%.2f, R^2=%.3f (Pos)' % (rmsd, r2))
+    ax.legend(loc='best', fontsize=20, numpoints=1)
     lo = np.min([np.min(y_aff), np.min(y_predaff)])
     hi = np.max([np.max(y_aff), np.max(y_predaff)])
-    plt.xlim(lo, hi)
-    plt.ylim(lo, hi)
-    plt.xlabel('Experimental Affinity', fontsize=22)
-    plt.ylabel('Predicted Affinity', fontsize=22)
-    plt.axes().set_aspect('equal')
-    plt.savefig(plot_file, bbox_inches='tight')
+    ax.set_xlim(lo, hi)
+    ax.set_ylim(lo, hi)
+    ax.set_xlabel('Experimental Affinity', fontsize=22)
+    ax.set_ylabel('Predicted Affinity', fontsize=22)
+    ax.set_aspect('equal')
+    save_axes(plot_file, ax, close)
 
 
 def check_file_exists(file):
@@ -77,41 +110,94 @@ def check_file_exists(file):
         raise OSError('%s does not exist' % file)
 
 
+#matches what follows the prefix in a results file name, capturing the fold number
+RESULTS_FILE_PATTERN = re.compile(r'\.(\d+)\.(out|(auc|rmsd)\.final(test|train)2?)$')
+
+
 def get_results_files(prefix, foldnums, binary_class, affinity, two_data_sources):
     files = {}
     if foldnums is None:
         foldnums = set()
-        pattern = r'%s\.(\d+)\.(out|(auc|rmsd)\.final(test|train)2?)$' % prefix
-        for file in glob.glob(prefix + '*'):
-            match = re.match(pattern, file)
-            if match:
-                foldnums.add(int(match.group(1)))
+        dirname, basename = os.path.split(prefix)
+        for file in os.listdir(dirname or '.'):
+            if file.startswith(basename):
+                match = RESULTS_FILE_PATTERN.match(file, len(basename))
+                if match:
+                    foldnums.add(int(match.group(1)))
     elif isinstance(foldnums, str):
         foldnums = [int(i) for i in foldnums.split(',') if i]
+    suffixes = ['out']
+    if binary_class:
+        suffixes += ['auc.finaltest', 'auc.finaltrain']
+    if affinity:
+        suffixes += ['rmsd.finaltest', 'rmsd.finaltrain']
+    if two_data_sources:
+        suffixes += [s + '2' for s in suffixes[1:]]
+    keys = [s.replace('.', '_') for s in suffixes]
     for i in foldnums:
         files[i] = {}
-        files[i]['out'] = '%s.%d.out' % (prefix, i)
-        if binary_class:
-            files[i]['auc_finaltest'] = '%s.%d.auc.finaltest' % (prefix, i)
-            files[i]['auc_finaltrain'] = '%s.%d.auc.finaltrain' % (prefix, i)
-        if affinity:
-            files[i]['rmsd_finaltest'] = '%s.%d.rmsd.finaltest' % (prefix, i)
-            files[i]['rmsd_finaltrain'] = '%s.%d.rmsd.finaltrain' % (prefix, i)
-        if two_data_sources:
-            if binary_class:
-                files[i]['auc_finaltest2'] = '%s.%d.auc.finaltest2' % (prefix, i)
-                files[i]['auc_finaltrain2'] = '%s.%d.auc.finaltrain2' % (prefix, i)
-            if affinity:
-                files[i]['rmsd_finaltest2'] = '%s.%d.rmsd.finaltest2' % (prefix, i)
-                files[i]['rmsd_finaltrain2'] = '%s.%d.rmsd.finaltrain2' % (prefix, i)
-    for i in files:
-        for file in files[i].values():
-            check_file_exists(file)
+        for key, suffix in zip(keys, suffixes):
+            files[i][key] = '%s.%d.%s' % (prefix, i, suffix)
+            check_file_exists(files[i][key])
     return files
 
 
+def rmsd_r2(y, y_pred):
+    '''Return the RMSD and R^2 of y_pred relative to y, sharing
+    the float conversion and residuals between the two metrics'''
+    y = np.asarray(y, dtype=np.float64)
+    res = y - np.asarray(y_pred, dtype=np.float64)
+    dev = y - y.mean()
+    ss_res = np.dot(res, res)
+    ss_tot = np.dot(dev, dev)
+    rmsd = np.sqrt(ss_res / len(y))
+    if ss_tot == 0: #same convention as sklearn.metrics.r2_score
+        return rmsd, 1.0 if ss_res == 0 else 0.0
+    return rmsd, 1 - ss_res / ss_tot
+
+
+def roc_auc(y_true, y_score):
+    '''Return the false and true positive rates at each distinct score
+    threshold and the area under that ROC curve, sorting the scores once'''
+    y_score = np.asarray(y_score)
+    order = np.argsort(y_score, kind='mergesort')[::-1]
+    y_score = y_score[order]
+    y_true = np.asarray(y_true)[order] > 0 #positive class is 1, negatives 0 or -1
+    #last position of each run of tied scores
+    idx = np.r_[np.flatnonzero(np.diff(y_score)), len(y_score) - 1]
+    tps = np.cumsum(y_true)[idx]
+    fps = idx + 1 - tps
+    if tps[-1] == 0 or fps[-1] == 0:
+        raise ValueError('ROC AUC needs both positive and negative labels')
+    tpr = np.r_[0, tps] / float(tps[-1])
+    fpr = np.r_[0, fps] / float(fps[-1])
+    auc = np.dot(np.diff(fpr), tpr[1:] + tpr[:-1]) / 2
+    return fpr, tpr, auc
+
+
 def filter_actives(values, y_true):
-    return np.array(values)[np.array(y_true, dtype=np.bool)]
+    '''Return the values whose label in y_true is active (nonzero)'''
+    return np.asarray(values)[np.asarray(y_true).astype(bool, copy=False)]
+
+
+def concatenate_folds(chunks):
+    '''Concatenate per-fold arrays, returning an empty array if there are none'''
+    if not chunks:
+        return np.empty(0)
+    return np.concatenate(chunks)
+
+
+def roc_results(outprefix, split, two, labels, preds, metrics, test_interval, ax=None):
+    '''Write final predictions and plot the ROC curve for one split
+    (test or train), if its labels include both classes'''
+    if len(labels) == 0 or np.ptp(labels) == 0:
+        return
+    last_iters = 1000
+    avg_auc, max_auc, min_auc = last_iters_statistics(metrics, test_interval, last_iters)
+    txt = 'For the last %s iterations:\nmean AUC=%.2f  max AUC=%.2f  min AUC=%.2f' % (last_iters, avg_auc, max_auc, min_auc)
+    fpr, tpr, auc = roc_auc(labels, preds)
+    write_results_file('%s.auc.final%s%s' % (outprefix, split, two), labels, preds, footer='AUC %f\n' % auc)
+    plot_roc_curve('%s_roc_%s%s.pdf' % (outprefix, split, two), fpr, tpr, auc, txt, ax)
 
 
 def combine_fold_results(test_metrics, train_metrics, test_labels, test_preds, train_labels, train_preds,
@@ -131,65 +217,58 @@ def combine_fold_results(test_metrics, train_metrics, test_labels, test_preds, t
     metric = 'rmsd' if affinity else 'auc'
     two = '2' if second_data_source else ''
 
+    #convert once, so the reductions below all run over contiguous arrays
+    test_metrics = np.ascontiguousarray(test_metrics, dtype=np.float32)
+    train_metrics = np.ascontiguousarray(train_metrics, dtype=np.float32)
+
     #average metric across folds
-    mean_test_metrics = np.mean(test_metrics, axis=0)
-    mean_train_metrics = np.mean(train_metrics, axis=0)
+    mean_test_metrics = test_metrics.mean(axis=0)
+    mean_train_metrics = train_metrics.mean(axis=0)
 
     #write test and train metrics (mean and for each fold)
     write_results_file('%s.%s.test%s' % (outprefix, metric, two), mean_test_metrics, *test_metrics)
     write_results_file('%s.%s.train%s' % (outprefix, metric, two), mean_train_metrics, *train_metrics)
 
-    #training plot of mean test and train metric across folds
-    training_plot('%s_%s_train%s.pdf' % (outprefix, metric, two), mean_train_metrics, mean_test_metrics)
+    #reuse one figure for all the plots below, closing it even on errors
+    fig, ax = plt.subplots()
 
-    if affinity:
+    try:
+        #training plot of mean test and train metric across folds
+        training_plot('%s_%s_train%s.pdf' % (outprefix, metric, two), mean_train_metrics, mean_test_metrics, ax)
 
-        if filter_actives_test:
-            test_preds = filter_actives(test_preds, filter_actives_test)
-            test_labels = filter_actives(test_labels, filter_actives_test)
+        if affinity:
 
-        #correlation plots for last test iteration
-        rmsd = np.sqrt(sklearn.metrics.mean_squared_error(test_preds, test_labels))
-        r2 = sklearn.metrics.r2_score(test_preds, test_labels)
-        write_results_file('%s.rmsd.finaltest%s' % (outprefix, two), test_preds, test_labels, footer='RMSD,R^2 %f %f\n' % (rmsd, r2))
-        plot_correlation('%s_corr_test%s.pdf' % (outprefix, two), test_preds, test_labels, rmsd, r2)
+            if filter_actives_test is not None and len(filter_actives_test) > 0:
+                test_preds = filter_actives(test_preds, filter_actives_test)
+                test_labels = filter_actives(test_labels, filter_actives_test)
 
-        if filter_actives_train:
-            train_preds = filter_actives(train_preds, filter_actives_train)
-            train_labels = filter_actives(train_labels, filter_actives_train)
+            #correlation plots for last test iteration
+            rmsd, r2 = rmsd_r2(test_preds, test_labels)
+            write_results_file('%s.rmsd.finaltest%s' % (outprefix, two), test_preds, test_labels, footer='RMSD,R^2 %f %f\n' % (rmsd, r2))
+            plot_correlation('%s_corr_test%s.pdf' % (outprefix, two), test_preds, test_labels, rmsd, r2, ax)
 
-        rmsd = np.sqrt(sklearn.metrics.mean_squared_error(train_preds, train_labels))
-        r2 = sklearn.metrics.r2_score(train_preds, train_labels)
-        write_results_file('%s.rmsd.finaltrain%s' % (outprefix, two), train_preds, train_labels, footer='RMSD,R^2 %f %f\n' % (rmsd, r2))
-        plot_correlation('%s_corr_train%s.pdf' % (outprefix, two), train_preds, train_labels, rmsd, r2)
+            if filter_actives_train is not None and len(filter_actives_train) > 0:
+                train_preds = filter_actives(train_preds, filter_actives_train)
+                train_labels = filter_actives(train_labels, filter_actives_train)
 
-    else:
+            rmsd, r2 = rmsd_r2(train_preds, train_labels)
+            write_results_file('%s.rmsd.finaltrain%s' % (outprefix, two), train_preds, train_labels, footer='RMSD,R^2 %f %f\n' % (rmsd, r2))
+            plot_correlation('%s_corr_train%s.pdf' % (outprefix, two), train_preds, train_labels, rmsd, r2, ax)
 
-        #roc curves for the last test iteration
-        if len(np.unique(test_labels)) > 1:
-            last_iters = 1000
-            avg_auc, max_auc, min_auc = last_iters_statistics(test_metrics, test_interval, last_iters)
-            txt = 'For the last %s iterations:\nmean AUC=%.2f  max AUC=%.2f  min AUC=%.2f' % (last_iters, avg_auc, max_auc, min_auc)
-            fpr, tpr, _ = sklearn.metrics.roc_curve(test_labels, test_preds)
-            auc = sklearn.metrics.roc_auc_score(test_labels, test_preds)
-            write_results_file('%s.auc.finaltest%s' % (outprefix, two), test_labels, test_preds, footer='AUC %f\n' % auc)
-            plot_roc_curve('%s_roc_test%s.pdf' % (outprefix, two), fpr, tpr, auc, txt)
+        else:
 
-        if len(np.unique(train_labels)) > 1:
-            last_iters = 1000
-            avg_auc, max_auc, min_auc = last_iters_statistics(train_metrics, test_interval, last_iters)
-            txt = 'For the last %s iterations:\nmean AUC=%.2f  max AUC=%.2f  min AUC=%.2f' % (last_iters, avg_auc, max_auc, min_auc)
-            fpr, tpr, _ = sklearn.metrics.roc_curve(train_labels, train_preds)
-            auc = sklearn.metrics.roc_auc_score(train_labels, train_preds)
-            write_results_file('%s.auc.finaltrain%s' % (outprefix, two), train_labels, train_preds, footer='AUC %f\n' % auc)
-            plot_roc_curve('%s_roc_train%s.pdf' % (outprefix, two), fpr, tpr, auc, txt)
+            #roc curves for the last test iteration
+            roc_results(outprefix, 'test', two, test_labels, test_preds, test_metrics, test_interval, ax)
+            roc_results(outprefix, 'train', two, train_labels, train_preds, train_metrics, test_interval, ax)
 
+    finally:
+        plt.close(fig)
 
 
 def parse_args(argv=None):
     parser = argparse.ArgumentParser(description='Combine training results from different folds and make graphs')
     parser.add_argument('-o','--outprefix',type=str,required=True,help="Prefix for input and output files (--outprefix from train.py)")
-    parser.add_argument('-n','--foldnums',type=str,required=False,help="Fold numbers to combine, default is to determine using glob",default=None)
+    parser.add_argument('-n','--foldnums',type=str,required=False,help="Fold numbers to combine, default is to determine from existing results files",default=None)
     parser.add_argument('-a','--affinity',default=False,action='store_true',required=False,help="Also look for affinity results files")
     parser.add_argument('--affinity_only',default=False,action='store_true',required=False,help="ONLY look for affinity results files")
     parser.add_argument('-2','--two_data_sources',default=False,action='store_true',required=False,help="Whether to look for 2nd data source results files")
@@ -211,73 +290,93 @@ if __name__ == '__main__':
     try:
         results_files = get_results_files(args.outprefix, args.foldnums, binary_class, affinity, args.two_data_sources)
     except OSError as e:
-        print "error: %s" % e
+        print("error: %s" % e)
         sys.exit(1)
 
     if len(results_files) == 0:
-        print "error: missing results files"
+        print("error: missing results files")
         sys.exit(1)
 
     for i in results_files:
         for key in sorted(results_files[i], key=len):
-            print str(i).rjust(3), key.rjust(15), results_files[i][key]
+            print(str(i).rjust(3), key.rjust(15), results_files[i][key])
+
+    #the first fold's .out file gives the number of tests; its columns are
+    #reused in the loop below. Each enabled metric gets a (n_folds, n_tests)
+    #array filled one fold per row
+    first_out_columns = read_results_file(next(iter(results_files.values()))['out'], np.float32)
+    shape = (len(results_files), len(first_out_columns[0]))
+    test_aucs = train_aucs = test_rmsds = train_rmsds = None
+    test2_aucs = train2_aucs = test2_rmsds = train2_rmsds = None
+    if binary_class:
+        test_aucs, train_aucs = np.empty(shape, dtype=np.float32), np.empty(shape, dtype=np.float32)
+    if affinity:
+        test_rmsds, train_rmsds = np.empty(shape, dtype=np.float32), np.empty(shape, dtype=np.float32)
+    if args.two_data_sources:
+        if binary_class:
+            test2_aucs, train2_aucs = np.empty(shape, dtype=np.float32), np.empty(shape, dtype=np.float32)
+        if affinity:
+            test2_rmsds, train2_rmsds = np.empty(shape, dtype=np.float32), np.empty(shape, dtype=np.float32)
 
-    test_aucs, train_aucs = [], []
-    test_rmsds, train_rmsds = [], []
     test_y_true, train_y_true = [], []
     test_y_score, train_y_score = [], []
     test_y_aff, train_y_aff = [], []
     test_y_predaff, train_y_predaff = [], []
-    test2_aucs, train2_aucs = [], []
-    test2_rmsds, train2_rmsds = [], []
     test2_y_true, train2_y_true = [], []
     test2_y_score, train2_y_score = [], []
     test2_y_aff, train2_y_aff = [], []
     test2_y_predaff, train2_y_predaff = [], []
 
     #read results files
-    for i in results_files:
+    for k, i in enumerate(results_files):
 
         if binary_class:
             y_true, y_score = read_results_file(results_files[i]['auc_finaltest'])
-            test_y_true.extend(y_true)
-            test_y_score.extend(y_score)
+            test_y_true.append(y_true)
+            test_y_score.append(y_score)
             y_true, y_score = read_results_file(results_files[i]['auc_finaltrain'])
-            train_y_true.extend(y_true)
-            train_y_score.extend(y_score)
+            train_y_true.append(y_true)
+            train_y_score.append(y_score)
 
         if affinity:
             y_aff, y_predaff = read_results_file(results_files[i]['rmsd_finaltest'])
-            test_y_aff.extend(y_aff)
-            test_y_predaff.extend(y_predaff)
+            test_y_aff.append(y_aff)
+            test_y_predaff.append(y_predaff)
             y_aff, y_predaff = read_results_file(results_files[i]['rmsd_finaltrain'])
-            train_y_aff.extend(y_aff)
-            train_y_predaff.extend(y_predaff)
+            train_y_aff.append(y_aff)
+            train_y_predaff.append(y_predaff)
 
         if args.two_data_sources:
             if binary_class:
                 y_true, y_score = read_results_file(results_files[i]['auc_finaltest2'])
-                test2_y_true.extend(y_true)
-                test2_y_score.extend(y_score)
+                test2_y_true.append(y_true)
+                test2_y_score.append(y_score)
                 y_true, y_score = read_results_file(results_files[i]['auc_finaltrain2'])
-                train2_y_true.extend(y_true)
-                train2_y_score.extend(y_score)
+                train2_y_true.append(y_true)
+                train2_y_score.append(y_score)
 
             if affinity:
                 y_aff, y_predaff = read_results_file(results_files[i]['rmsd_finaltest2'])
-                test2_y_aff.extend(y_aff)
-                test2_y_predaff.extend(y_predaff)
+                test2_y_aff.append(y_aff)
+                test2_y_predaff.append(y_predaff)
                 y_aff, y_predaff = read_results_file(results_files[i]['rmsd_finaltrain2'])
-                train2_y_aff.extend(y_aff)
-                train2_y_predaff.extend(y_predaff)
+                train2_y_aff.append(y_aff)
+                train2_y_predaff.append(y_predaff)
 
+        #metrics only need float32, unlike the label/prediction files above
         #[test_auc train_auc train_loss] lr [test_rmsd train_rmsd] [[test2_auc train2_auc train2_loss] [test2_rmsd train2_rmsd]]
-        out_columns = read_results_file(results_files[i]['out'])
+        if k == 0:
+            out_columns = first_out_columns
+        else:
+            out_columns = read_results_file(results_files[i]['out'], np.float32)
+        if len(out_columns[0]) != shape[1]:
+            print("error: %s has %d tests, expected %d" % (results_files[i]['out'], len(out_columns[0]), shape[1]))
+            sys.exit(1)
 
         col_idx = 0
         if binary_class:
-            test_aucs.append(out_columns[col_idx])
-            train_aucs.append(out_columns[col_idx+1])
+            test_aucs[k] = out_columns[col_idx]
+            train_aucs[k] = out_columns[col_idx+1]
             #ignore train_loss
             col_idx += 3
 
@@ -285,22 +384,32 @@ if __name__ == '__main__':
         col_idx += 1
 
         if affinity:
-            test_rmsds.append(out_columns[col_idx])
-            train_rmsds.append(out_columns[col_idx+1])
+            test_rmsds[k] = out_columns[col_idx]
+            train_rmsds[k] = out_columns[col_idx+1]
             col_idx += 2
 
         if args.two_data_sources:
             if binary_class:
-                test2_aucs.append(out_columns[col_idx])
-                train2_aucs.append(out_columns[col_idx+1])
+                test2_aucs[k] = out_columns[col_idx]
+                train2_aucs[k] = out_columns[col_idx+1]
                 #ignore train2_loss
                 col_idx += 3
 
             if affinity:
-                test2_rmsds.append(out_columns[col_idx])
-                train2_rmsds.append(out_columns[col_idx+1])
+                test2_rmsds[k] = out_columns[col_idx]
+                train2_rmsds[k] = out_columns[col_idx+1]
                 col_idx += 2
 
+    #join the per-fold chunks of each series into one array
+    test_y_true, train_y_true = concatenate_folds(test_y_true), concatenate_folds(train_y_true)
+    test_y_score, train_y_score = concatenate_folds(test_y_score), concatenate_folds(train_y_score)
+    test_y_aff, train_y_aff = concatenate_folds(test_y_aff), concatenate_folds(train_y_aff)
+    test_y_predaff, train_y_predaff = concatenate_folds(test_y_predaff), concatenate_folds(train_y_predaff)
+    test2_y_true, train2_y_true = concatenate_folds(test2_y_true), concatenate_folds(train2_y_true)
+    test2_y_score, train2_y_score = concatenate_folds(test2_y_score), concatenate_folds(train2_y_score)
+    test2_y_aff, train2_y_aff = concatenate_folds(test2_y_aff), concatenate_folds(train2_y_aff)
+    test2_y_predaff, train2_y_predaff = concatenate_folds(test2_y_predaff), concatenate_folds(train2_y_predaff)
+
     if binary_class:
         combine_fold_results(test_aucs, train_aucs, test_y_true, test_y_score, train_y_true, train_y_score,
                              args.outprefix, args.test_interval, affinity=False, second_data_source=False)